@@ -6,7 +6,8 @@ preview window (rendered HTML) in sync. It supports a subset of SS13-like
 pencode tags and provides quick formatting actions via toolbar + shortcuts.
 
 Requirements:
-  pip install PySide6 PySide6-Addons
+  pip install PySide6
+  pip install PySide6-Addons             (optional, for PaperConfig(use_webengine=True))
 
 Run:
   python SSnote.py
@@ -31,11 +32,17 @@ Shortcuts (selection-aware):
 from __future__ import annotations
 
 import datetime
+import functools
+import hashlib
 import html
+import json
+import re
 import sys
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Callable, Iterable, Optional
 
 from PySide6 import QtCore, QtGui, QtWidgets
 
@@ -44,6 +51,9 @@ try:
 except ImportError:  # pragma: no cover - depends on optional Qt component
     QWebEngineView = None  # type: ignore
 
+RENDER_CACHE_SIZE = 16
+SEGMENT_CACHE_SIZE = 512
+
 
 @dataclass(frozen=True)
 class PaperConfig:
@@ -52,6 +62,8 @@ class PaperConfig:
     sign_font: str = "Times New Roman"
     crayon_font: str = "Comic Sans MS"
     pen_color: str = "black"
+    render_throttle_ms: int = 200
+    use_webengine: bool = False
 
 
 def encode_byondish_html(text: str) -> str:
@@ -59,6 +71,12 @@ def encode_byondish_html(text: str) -> str:
     return escaped.replace("'", "&#39;")
 
 
+@functools.lru_cache(maxsize=128)
+def _encode_short_html(text: str) -> str:
+    """encode_byondish_html for the signature, which is escaped again on every render that uses [sign]."""
+    return encode_byondish_html(text)
+
+
 def station_time_text(now: Optional[datetime.datetime] = None) -> str:
     return (now or datetime.datetime.now()).strftime("%H:%M")
 
@@ -75,12 +93,121 @@ def resolved_signature(signature: Optional[str], user_name: Optional[str]) -> st
     return "Anonymous"
 
 
-def _replace_in_order(text: str, replacements: list[tuple[str, str]]) -> str:
-    for needle, repl in replacements:
-        text = text.replace(needle, repl)
+_TAG_RE = re.compile(r"\[/?[a-z0-9*]+\]")
+# Tags whose output depends on the render inputs rather than on the text alone.
+# Captured so split() keeps them between the surrounding pieces of text.
+_DYNAMIC_TAG_RE = re.compile(r"(\[(?:time|date|station|sign)\])")
+
+# BYOND-style pencode treats raw newlines as no-ops; only [br] creates a break.
+# Strip common newline/paragraph-separator characters so they do not render as spaces.
+_NEWLINE_KILL = str.maketrans("", "", "\r\n\u2028\u2029")
+# QTextBlock.text() keeps characters that QTextDocument.toPlainText() normalizes; apply the same mapping.
+_BLOCK_TEXT_FIXUP = str.maketrans({"\u00a0": " ", "\u2028": "\n"})
+
+_COMMON_TABLE: dict[str, str] = {
+    "[center]": "<center>",
+    "[/center]": "</center>",
+    "[br]": "<BR>",
+    "[b]": "<B>",
+    "[/b]": "</B>",
+    "[i]": "<I>",
+    "[/i]": "</I>",
+    "[u]": "<U>",
+    "[/u]": "</U>",
+    "[large]": '<font size="4">',
+    "[/large]": "</font>",
+    "[field]": '<span class="paper_field"></span>',
+    "[h1]": "<H1>",
+    "[/h1]": "</H1>",
+    "[h2]": "<H2>",
+    "[/h2]": "</H2>",
+    "[h3]": "<H3>",
+    "[/h3]": "</H3>",
+    "[tab]": "&nbsp;" * 6,
+}
+# DM replaces [station] before these tags, so the station name still goes through them.
+_TAGS_AFTER_STATION = (
+    "[large]", "[/large]", "[field]", "[h1]", "[/h1]", "[h2]", "[/h2]", "[h3]", "[/h3]", "[tab]",
+)
+
+# Logos (kept as unresolved \ref paths like in DM)
+_NT_LOGO = sys.intern("<img src=\\ref['html/images/ntlogo.png']>")
+_SG_LOGO = sys.intern("<img src=\\ref['html/images/sglogo.png']>")
+_TR_LOGO = sys.intern("<img src=\\ref['html/images/trader.png']>")
+_PC_LOGO = sys.intern("<img src=\\ref['html/images/pclogo.png']>")
+
+_PEN_TABLE: dict[str, str] = {
+    "[*]": "<li>",
+    "[hr]": "<HR>",
+    "[small]": '<font size="1">',
+    "[/small]": "</font>",
+    "[list]": "<ul>",
+    "[/list]": "</ul>",
+    "[table]": "<table border=1 cellspacing=0 cellpadding=3 style='border: 1px solid black;'>",
+    "[/table]": "</td></tr></table>",
+    "[grid]": "<table>",
+    "[/grid]": "</td></tr></table>",
+    "[row]": "</td><tr>",
+    "[/row]": "",
+    "[cell]": "<td>",
+    "[/cell]": "",
+    "[logo]": _NT_LOGO,
+    "[sglogo]": _SG_LOGO,
+    "[trlogo]": _TR_LOGO,
+    "[pclogo]": _PC_LOGO,
+}
+
+# Pen-only tags that crayons cannot produce; they are dropped instead of rendered.
+_CRAYON_DROP: dict[str, str] = dict.fromkeys(
+    (
+        "[*]", "[hr]", "[small]", "[/small]", "[list]", "[/list]",
+        "[table]", "[/table]", "[row]", "[cell]", "[/cell]", "[/row]",
+        "[logo]", "[sglogo]",
+    ),
+    "",
+)
+
+_PEN_DISPATCH: dict[str, str] = {**_COMMON_TABLE, **_PEN_TABLE}
+_CRAYON_DISPATCH: dict[str, str] = {**_COMMON_TABLE, **_CRAYON_DROP}
+
+
+def _pencode_segments(html_text: str) -> list[str]:
+    """Split text on newlines into segments that no tag straddles."""
+    segments: list[str] = []
+    pending: list[str] = []
+    bracket_open = False
+    for line in html_text.split("\n"):
+        pending.append(line)
+        last_open = line.rfind("[")
+        last_close = line.rfind("]")
+        if last_open != last_close:
+            bracket_open = last_open > last_close
+        if not bracket_open:
+            segments.append("\n".join(pending))
+            pending.clear()
+    if pending:
+        segments.append("\n".join(pending))
+    return segments
+
+
+# Rendered segment pieces and their [field] count. Even pieces are html; odd pieces are the
+# [time]/[date]/[station]/[sign] tags written in the source, resolved per render.
+RenderedSegment = tuple[tuple[str, ...], int]
+SegmentCache = dict[bytes, RenderedSegment]
+
+
+def _replace_tags_in_order(text: str, tags: Iterable[str], table: dict[str, str]) -> str:
+    for tag in tags:
+        text = text.replace(tag, table[tag])
     return text
 
 
+def _render_segment(html_text: str, table: dict[str, str]) -> RenderedSegment:
+    pieces = _DYNAMIC_TAG_RE.split(html_text.translate(_NEWLINE_KILL))
+    pieces[::2] = [_TAG_RE.sub(lambda match: table.get(match.group(0), match.group(0)), piece) for piece in pieces[::2]]
+    return tuple(pieces), sum(piece.count('<span class="paper_field">') for piece in pieces[::2])
+
+
 def render_pencode_to_html(
     raw_text: str,
     *,
@@ -89,133 +216,281 @@ def render_pencode_to_html(
     signature: Optional[str] = None,
     is_crayon: bool = False,
     now: Optional[datetime.datetime] = None,
+    segment_cache: Optional[SegmentCache] = None,
 ) -> tuple[str, int]:
     """Convert pencode-like markup into an HTML snippet.
 
+    segment_cache, when given, memoizes rendered lines across calls so only edited lines are re-rendered.
+
     Returns (html_snippet, field_count).
     """
-    now = now or datetime.datetime.now()
-
-    html_text = encode_byondish_html(raw_text)
-    # BYOND-style pencode treats raw newlines as no-ops; only [br] creates a break.
-    # Strip common newline/paragraph-separator characters so they do not render as spaces.
-    html_text = (
-        html_text.replace("\r\n", "")
-        .replace("\n", "")
-        .replace("\r", "")
-        .replace("\u2028", "")
-        .replace("\u2029", "")
+    return render_escaped_pencode_to_html(
+        encode_byondish_html(raw_text),
+        paper_config=paper_config,
+        user_name=user_name,
+        signature=signature,
+        is_crayon=is_crayon,
+        now=now,
+        segment_cache=segment_cache,
+    )
+
+
+def render_escaped_pencode_to_html(
+    html_text: str,
+    *,
+    paper_config: PaperConfig,
+    user_name: Optional[str] = None,
+    signature: Optional[str] = None,
+    is_crayon: bool = False,
+    now: Optional[datetime.datetime] = None,
+    segment_cache: Optional[SegmentCache] = None,
+) -> tuple[str, int]:
+    """Same as render_pencode_to_html, for text that already went through encode_byondish_html."""
+    render = build_renderer(paper_config, is_crayon=is_crayon)
+    return render(
+        html_text,
+        now=now or datetime.datetime.now(),
+        user_name=user_name,
+        signature=signature,
+        segment_cache=segment_cache,
     )
 
-    common_replacements: list[tuple[str, str]] = [
-        ("[center]", "<center>"),
-        ("[/center]", "</center>"),
-        ("[br]", "<BR>"),
-        ("[b]", "<B>"),
-        ("[/b]", "</B>"),
-        ("[i]", "<I>"),
-        ("[/i]", "</I>"),
-        ("[u]", "<U>"),
-        ("[/u]", "</U>"),
-        ("[time]", station_time_text(now)),
-        ("[date]", station_date_text(now)),
-        ("[station]", paper_config.station_name),
-        ("[large]", '<font size="4">'),
-        ("[/large]", "</font>"),
-        ("[field]", '<span class="paper_field"></span>'),
-        ("[h1]", "<H1>"),
-        ("[/h1]", "</H1>"),
-        ("[h2]", "<H2>"),
-        ("[/h2]", "</H2>"),
-        ("[h3]", "<H3>"),
-        ("[/h3]", "</H3>"),
-        ("[tab]", "&nbsp;" * 6),
-    ]
-    html_text = _replace_in_order(html_text, common_replacements)
-
-    if "[sign]" in html_text:
-        signature_text = encode_byondish_html(resolved_signature(signature, user_name))
-        signature_html = f'<font face="{paper_config.sign_font}"><i>{signature_text}</i></font>'
-        html_text = html_text.replace("[sign]", signature_html)
 
+@functools.lru_cache(maxsize=8)
+def build_renderer(paper_config: PaperConfig, *, is_crayon: bool) -> Callable[..., tuple[str, int]]:
+    """Specialize the escaped-pencode renderer for one paper config and pen/crayon mode.
+
+    The returned callable takes (html_text, *, now, user_name=None, signature=None, segment_cache=None)
+    and returns (html_snippet, field_count).
+    """
+    table = _CRAYON_DISPATCH if is_crayon else _PEN_DISPATCH
+    # Pen-only tags (or crayon drops) come last in DM, after [station] and [sign] are inserted.
+    mode_tags = tuple(_CRAYON_DROP if is_crayon else _PEN_TABLE)
+    mode = b"crayon" if is_crayon else b"pen"
     if is_crayon:
-        restricted_tokens = [
-            "[*]", "[hr]", "[small]", "[/small]", "[list]", "[/list]",
-            "[table]", "[/table]", "[row]", "[cell]", "[/cell]", "[/row]",
-            "[logo]", "[sglogo]",
-        ]
-        for token in restricted_tokens:
-            html_text = html_text.replace(token, "")
-        html_text = (
-            f'<font face="{paper_config.crayon_font}" color={paper_config.pen_color}>'
-            f'<b>{html_text}</b></font>'
-        )
+        wrap_prefix = sys.intern(f'<font face="{paper_config.crayon_font}" color={paper_config.pen_color}><b>')
+        wrap_suffix = "</b></font>"
     else:
-        pen_only_replacements: list[tuple[str, str]] = [
-            ("[*]", "<li>"),
-            ("[hr]", "<HR>"),
-            ("[small]", '<font size="1">'),
-            ("[/small]", "</font>"),
-            ("[list]", "<ul>"),
-            ("[/list]", "</ul>"),
-            ("[table]", "<table border=1 cellspacing=0 cellpadding=3 style='border: 1px solid black;'>"),
-            ("[/table]", "</td></tr></table>"),
-            ("[grid]", "<table>"),
-            ("[/grid]", "</td></tr></table>"),
-            ("[row]", "</td><tr>"),
-            ("[/row]", ""),
-            ("[cell]", "<td>"),
-            ("[/cell]", ""),
-            # Logos (kept as unresolved \ref paths like in DM)
-            ("[logo]", "<img src=\\ref['html/images/ntlogo.png']>"),
-            ("[sglogo]", "<img src=\\ref['html/images/sglogo.png']>"),
-            ("[trlogo]", "<img src=\\ref['html/images/trader.png']>"),
-            ("[pclogo]", "<img src=\\ref['html/images/pclogo.png']>"),
-        ]
-        html_text = _replace_in_order(html_text, pen_only_replacements)
-        html_text = f'<font face="{paper_config.default_font}" color={paper_config.pen_color}>{html_text}</font>'
-
-    field_count = html_text.count('<span class="paper_field">')
-    return html_text, field_count
+        wrap_prefix = sys.intern(f'<font face="{paper_config.default_font}" color={paper_config.pen_color}>')
+        wrap_suffix = "</font>"
+    sign_prefix = sys.intern(f'<font face="{paper_config.sign_font}"><i>')
+    sign_suffix = "</i></font>"
+    station_html = _replace_tags_in_order(paper_config.station_name, _TAGS_AFTER_STATION, table)
+    station_field_count = station_html.count('<span class="paper_field">')
+
+    def render(
+        html_text: str,
+        *,
+        now: datetime.datetime,
+        user_name: Optional[str] = None,
+        signature: Optional[str] = None,
+        segment_cache: Optional[SegmentCache] = None,
+    ) -> tuple[str, int]:
+        rendered_segments: list[RenderedSegment]
+        if segment_cache is None:
+            rendered_segments = [_render_segment(html_text, table)]
+        else:
+            used_keys: list[bytes] = []
+            rendered_segments = []
+            for segment in _pencode_segments(html_text):
+                key = hashlib.blake2b(segment.encode(), digest_size=8, person=mode).digest()
+                rendered = segment_cache.get(key)
+                if rendered is None:
+                    rendered = segment_cache[key] = _render_segment(segment, table)
+                used_keys.append(key)
+                rendered_segments.append(rendered)
+
+            if len(segment_cache) > SEGMENT_CACHE_SIZE:
+                # Prune to the segments of the current text; whatever else was cached is stale.
+                live_segments = {key: segment_cache[key] for key in used_keys}
+                segment_cache.clear()
+                segment_cache.update(live_segments)
+
+        # Resolved per render so cached segments stay independent of time, user and signature.
+        # Each value is formatted on first use only, so notes without these tags never call strftime.
+        resolved_tags: dict[str, str] = {}
+
+        def resolve(tag: str) -> str:
+            if tag == "[time]":
+                return station_time_text(now)
+            if tag == "[date]":
+                return station_date_text(now)
+            # Like DM's ordered replacements, the inserted station name and signature still go through
+            # the tags replaced after them; a [sign] in the station name gets the signature.
+            value = station_html if tag == "[station]" else "[sign]"
+            if "[sign]" in value:
+                sign_text = _encode_short_html(resolved_signature(signature, user_name))
+                value = value.replace("[sign]", sign_prefix + sign_text + sign_suffix)
+            return _replace_tags_in_order(value, mode_tags, table)
+
+        # Everything is collected into one parts list so the snippet is allocated by a single join.
+        parts: list[str] = [wrap_prefix]
+        field_count = 0
+        for pieces, segment_field_count in rendered_segments:
+            field_count += segment_field_count
+            parts.append(pieces[0])
+            for index in range(1, len(pieces), 2):
+                tag = pieces[index]
+                value = resolved_tags.get(tag)
+                if value is None:
+                    value = resolved_tags[tag] = resolve(tag)
+                if tag == "[station]":
+                    field_count += station_field_count
+                parts.append(value)
+                parts.append(pieces[index + 1])
+        parts.append(wrap_suffix)
+        return "".join(parts), field_count
+
+    return render
+
+
+_PREVIEW_CSS = (
+    "  body{ margin:12px; }\n"
+    "  .paper_field{ display:inline-block; min-width:140px; min-height:1.2em; "
+    "               border-bottom:1px dotted #888; vertical-align:baseline; }\n"
+)
+_DOC_PREFIX = (
+    "<!doctype html>\n"
+    "<html>\n<head>\n<meta charset='utf-8'>\n"
+    f"<style>\n{_PREVIEW_CSS}</style>\n"
+    "</head>\n<body>\n"
+)
+_DOC_SUFFIX = "\n</body>\n</html>\n"
 
 
 def wrap_in_document(snippet: str) -> str:
-    return (
-        "<!doctype html>\n"
-        "<html>\n<head>\n<meta charset='utf-8'>\n"
-        "<style>\n"
-        "  body{ margin:12px; }\n"
-        "  .paper_field{ display:inline-block; min-width:140px; min-height:1.2em; "
-        "               border-bottom:1px dotted #888; vertical-align:baseline; }\n"
-        "</style>\n"
-        "</head>\n<body>\n"
-        f"{snippet}\n"
-        "</body>\n</html>\n"
-    )
+    return _DOC_PREFIX + snippet + _DOC_SUFFIX
+
+
+_TAB_STOP_CACHE: dict[str, float] = {}
+
+
+def _tab_stop_for(font: QtGui.QFont) -> float:
+    """Four-space tab stop for font, measured once per distinct font."""
+    font_key = font.key()
+    tab_stop = _TAB_STOP_CACHE.get(font_key)
+    if tab_stop is None:
+        tab_stop = _TAB_STOP_CACHE[font_key] = 4 * QtGui.QFontMetrics(font).horizontalAdvance(" ")
+    return tab_stop
+
+
+class _RenderSignals(QtCore.QObject):
+    # (request_id, render_key, (snippet, field_count, snippet_digest))
+    finished = QtCore.Signal(int, object, object)
+    # (render_key, error message)
+    failed = QtCore.Signal(object, str)
+
+
+class _RenderTask(QtCore.QRunnable):
+    """Runs one preview render off the GUI thread and reports the result through _RenderSignals."""
+
+    def __init__(
+        self,
+        signals: _RenderSignals,
+        *,
+        request_id: int,
+        render_key: bytes,
+        render: Callable[[], tuple[str, int]],
+    ) -> None:
+        super().__init__()
+        self._signals = signals
+        self._request_id = request_id
+        self._render_key = render_key
+        self._render = render
+
+    def run(self) -> None:
+        try:
+            snippet, field_count = self._render()
+        except Exception as exc:  # Reported on the GUI thread rather than lost inside the pool.
+            self._signals.failed.emit(self._render_key, f"{type(exc).__name__}: {exc}")
+            return
+        snippet_digest = hashlib.blake2b(snippet.encode(), digest_size=8).digest()
+        self._signals.finished.emit(self._request_id, self._render_key, (snippet, field_count, snippet_digest))
 
 
 class PreviewWindow(QtWidgets.QMainWindow):
-    def __init__(self) -> None:
+    def __init__(self, *, paper_config: PaperConfig) -> None:
         super().__init__()
         self.setWindowTitle("Paper Preview")
 
-        if QWebEngineView is not None:
+        self._shell_loaded = False
+        self._shell_loading = False
+        # Latest (snippet, field_count) not yet shown; applied at most once per event-loop turn.
+        self._pending_update: Optional[tuple[str, int]] = None
+        self._flush_scheduled = False
+
+        # QTextBrowser renders this small tag set in-process; WebEngine (a Chromium subprocess) is opt-in.
+        if paper_config.use_webengine and QWebEngineView is not None:
             self._backend_name = "WebEngine"
             self._view = QWebEngineView()
+            # The document shell and stylesheet never change: load them once, then only patch <body>.
+            self._view.loadFinished.connect(self._on_shell_loaded)
+            self._load_shell("")
         else:
             self._backend_name = "QTextBrowser"
             text_browser = QtWidgets.QTextBrowser()
             text_browser.setOpenExternalLinks(True)
+            # Styles live on the document, so each render only needs to set the snippet.
+            text_browser.document().setDefaultStyleSheet(_PREVIEW_CSS)
             self._view = text_browser
 
         self.setCentralWidget(self._view)
         self._status_bar = self.statusBar()
-        if self._backend_name != "WebEngine":
+        if paper_config.use_webengine and self._backend_name != "WebEngine":
             self._status_bar.showMessage("Qt WebEngine not available: using QTextBrowser fallback.")
 
-    def set_rendered_html(self, html_document: str, *, field_count: int) -> None:
-        self._view.setHtml(html_document)
-        self._status_bar.showMessage(f"Fields: {field_count} | Backend: {self._backend_name}")
+    def _load_shell(self, snippet: str) -> None:
+        self._shell_loading = True
+        self._view.setHtml(wrap_in_document(snippet))
+
+    def _on_shell_loaded(self, ok: bool) -> None:
+        self._shell_loading = False
+        self._shell_loaded = ok
+        if not ok:
+            self._status_bar.showMessage("Preview failed to load; reloading it with the next render.")
+        self._flush_if_pending()
+
+    def _patch_body(self, snippet: str) -> None:
+        self._view.page().runJavaScript(f"document.body.innerHTML = {json.dumps(snippet)};")
+
+    def set_body_snippet(self, snippet: str, *, field_count: int) -> None:
+        # Several sources (typing, paste, mode toggles) can push within one turn; only the last one is shown.
+        self._pending_update = (snippet, field_count)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            QtCore.QTimer.singleShot(0, self._flush_if_pending)
+
+    def _flush_if_pending(self) -> None:
+        self._flush_scheduled = False
+        if self._pending_update is None:
+            return
+        if self._backend_name == "WebEngine" and self._shell_loading:
+            return  # _on_shell_loaded() flushes once the shell is ready.
+
+        snippet, field_count = self._pending_update
+        self._pending_update = None
+        status = f"Fields: {field_count} | Backend: {self._backend_name}"
+        if self._backend_name == "WebEngine" and not self._shell_loaded:
+            # The last shell load failed: load the whole document instead, which also becomes the new shell.
+            self._load_shell(snippet)
+            status += " (reloading after a failed load)"
+        elif self._backend_name == "WebEngine":
+            self._patch_body(snippet)
+        else:
+            self._view.setHtml(snippet)
+        self._status_bar.showMessage(status)
+
+
+class _PencodeEditor(QtWidgets.QPlainTextEdit):
+    # QPlainTextEdit has no fontChanged signal; FontChange keeps the tab stop in sync with the font.
+    def __init__(self) -> None:
+        super().__init__()
+        self.setTabStopDistance(_tab_stop_for(self.font()))
+
+    def changeEvent(self, event: QtCore.QEvent) -> None:
+        if event.type() == QtCore.QEvent.Type.FontChange:
+            self.setTabStopDistance(_tab_stop_for(self.font()))
+        super().changeEvent(event)
 
 
 class InputWindow(QtWidgets.QMainWindow):
@@ -226,39 +501,175 @@ class InputWindow(QtWidgets.QMainWindow):
         self._source_path = source_path
 
         self.setWindowTitle("Paper Input (Plaintext)")
-        self._editor = QtWidgets.QPlainTextEdit()
-        self._editor.setTabStopDistance(4 * QtGui.QFontMetrics(self._editor.font()).horizontalAdvance(" "))
+        self._editor = _PencodeEditor()
         self.setCentralWidget(self._editor)
 
-        self._render_debounce_timer = QtCore.QTimer(self)
-        self._render_debounce_timer.setSingleShot(True)
-        self._render_debounce_timer.setInterval(60)
-        self._render_debounce_timer.timeout.connect(self._render_preview)
+        # Leading+trailing throttle: the first edit renders immediately, a burst renders at most once per interval.
+        self._last_render_ts = 0.0
+        self._render_throttle_timer = QtCore.QTimer(self)
+        self._render_throttle_timer.setSingleShot(True)
+        self._render_throttle_timer.timeout.connect(self._on_render_throttle_timeout)
+        self._editor.document().contentsChange.connect(self._on_contents_change)
         self._editor.textChanged.connect(self._schedule_preview_render)
 
         self._is_crayon = False
+        # Renderers specialized for this paper config, one per mode; toggle_crayon_mode() swaps between them.
+        self._renderers = {
+            is_crayon: build_renderer(paper_config, is_crayon=is_crayon) for is_crayon in (False, True)
+        }
+        self._renderer = self._renderers[False]
         self._user_name: Optional[str] = None
         self._signature: Optional[str] = None
 
+        # (snippet, field_count, snippet digest) keyed by a digest of every render input; see _render_key().
+        self._render_cache: OrderedDict[bytes, tuple[str, int, bytes]] = OrderedDict()
+        self._last_render_key: Optional[bytes] = None
+        self._last_pushed_digest: Optional[bytes] = None
+        # encode_byondish_html() of each editor block, patched from contentsChange; see _on_contents_change().
+        self._escaped_lines: list[str] = [""]
+        self._segment_cache: SegmentCache = {}
+        self._cached_minute: Optional[tuple[int, datetime.datetime]] = None
+        # Digest of the document as of revision _revision; recomputed only when the document is dirty.
+        self._revision = -1
+        self._revision_digest = b""
+
+        # Renders run on a private single-thread pool, so the segment cache is only ever touched by one thread.
+        # The pool is created first so it is destroyed (and drained) before the signals.
+        self._render_pool = QtCore.QThreadPool(self)
+        self._render_pool.setMaxThreadCount(1)
+        self._render_signals = _RenderSignals(self)
+        self._render_signals.finished.connect(self._on_render_finished)
+        self._render_signals.failed.connect(self._on_render_failed)
+        self._render_request_id = 0
+
         self._build_formatting_toolbar_and_shortcuts()
         self._build_menu()
         self._load_initial_text()
         self._render_preview()
 
     def _schedule_preview_render(self) -> None:
-        self._render_debounce_timer.start()
+        if self._render_throttle_timer.isActive():
+            return  # The pending trailing render will pick this edit up.
+
+        elapsed_ms = (time.monotonic() - self._last_render_ts) * 1000
+        remaining_ms = self._paper_config.render_throttle_ms - elapsed_ms
+        if remaining_ms <= 0:
+            self._on_render_throttle_timeout()
+        else:
+            self._render_throttle_timer.start(int(remaining_ms) + 1)
+
+    def _on_render_throttle_timeout(self) -> None:
+        self._last_render_ts = time.monotonic()
+        self._render_preview()
+
+    def _current_minute(self) -> tuple[int, datetime.datetime]:
+        # [time]/[date] only resolve to the minute, so renders within the same minute share one timestamp.
+        minute = int(time.time() // 60)
+        if self._cached_minute is None or self._cached_minute[0] != minute:
+            self._cached_minute = (minute, datetime.datetime.fromtimestamp(minute * 60))
+        return self._cached_minute
+
+    def _render_key(self, text_digest: bytes, minute: int) -> bytes:
+        # JSON keeps the fields unambiguous (e.g. no signature vs. a signature literally named "None").
+        mode_salt = json.dumps([self._is_crayon, self._user_name, self._signature, minute])
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(mode_salt.encode())
+        digest.update(b"\0")
+        digest.update(text_digest)
+        return digest.digest()
+
+    @staticmethod
+    def _escape_block(block: QtGui.QTextBlock) -> str:
+        # Not cached: lines have no length limit and an edited line is a new string anyway.
+        return encode_byondish_html(block.text().translate(_BLOCK_TEXT_FIXUP))
+
+    def _on_contents_change(self, position: int, chars_removed: int, chars_added: int) -> None:
+        # Only blocks touched by the edit are re-escaped; the rest of _escaped_lines is still valid.
+        document = self._editor.document()
+        end_position = document.characterCount() - 1
+        first_block = document.findBlock(min(position, end_position))
+        last_number = document.findBlock(min(position + chars_added, end_position)).blockNumber()
+        old_last_number = last_number + len(self._escaped_lines) - document.blockCount()
+
+        fresh_lines: list[str] = []
+        block = first_block
+        for _ in range(first_block.blockNumber(), last_number + 1):
+            fresh_lines.append(self._escape_block(block))
+            block = block.next()
+        self._escaped_lines[first_block.blockNumber() : old_last_number + 1] = fresh_lines
+
+        if len(self._escaped_lines) != document.blockCount():
+            block = document.begin()
+            self._escaped_lines = []
+            while block.isValid():
+                self._escaped_lines.append(self._escape_block(block))
+                block = block.next()
+
+    def _doc_digest(self) -> bytes:
+        # Hashed line by line so the document text is only assembled when a render actually has to run.
+        digest = hashlib.blake2b(digest_size=16)
+        for line in self._escaped_lines:
+            digest.update(line.encode())
+            digest.update(b"\n")
+        return digest.digest()
 
     def _render_preview(self) -> None:
-        raw_text = self._editor.toPlainText()
-        snippet, field_count = render_pencode_to_html(
-            raw_text,
-            paper_config=self._paper_config,
+        # The document revision is a dirty bit: settings changes re-render without re-hashing the text.
+        revision = self._editor.document().revision()
+        if revision != self._revision:
+            self._revision = revision
+            self._revision_digest = self._doc_digest()
+
+        minute, now = self._current_minute()
+        key = self._render_key(self._revision_digest, minute)
+        if key == self._last_render_key:
+            return
+        self._last_render_key = key
+
+        # Any render still in flight is now stale, whether or not this one is served from the cache.
+        self._render_request_id += 1
+        cached = self._render_cache.get(key)
+        if cached is not None:
+            self._render_cache.move_to_end(key)
+            self._push_render(cached)
+            return
+
+        # Every input is snapshotted here; the worker never reads widget state.
+        render = functools.partial(
+            self._renderer,
+            "\n".join(self._escaped_lines),
+            now=now,
             user_name=self._user_name,
             signature=self._signature,
-            is_crayon=self._is_crayon,
-            now=datetime.datetime.now(),
+            segment_cache=self._segment_cache,
+        )
+        # Queued renders that have not started yet are superseded by this one; drop them.
+        self._render_pool.clear()
+        self._render_pool.start(
+            _RenderTask(self._render_signals, request_id=self._render_request_id, render_key=key, render=render)
         )
-        self._preview_window.set_rendered_html(wrap_in_document(snippet), field_count=field_count)
+
+    def _on_render_finished(self, request_id: int, key: bytes, cached: tuple[str, int, bytes]) -> None:
+        self._render_cache[key] = cached
+        if len(self._render_cache) > RENDER_CACHE_SIZE:
+            self._render_cache.popitem(last=False)
+        # A newer render was requested while this one ran; its result supersedes this one.
+        if request_id == self._render_request_id:
+            self._push_render(cached)
+
+    def _on_render_failed(self, key: bytes, message: str) -> None:
+        # Forget the key so the next edit or settings change retries this state.
+        if key == self._last_render_key:
+            self._last_render_key = None
+        self.statusBar().showMessage(f"Preview render failed: {message}")
+
+    def _push_render(self, cached: tuple[str, int, bytes]) -> None:
+        snippet, field_count, snippet_digest = cached
+        # Different inputs often render identically (e.g. trailing whitespace); skip the preview update then.
+        if snippet_digest == self._last_pushed_digest:
+            return
+        self._last_pushed_digest = snippet_digest
+        self._preview_window.set_body_snippet(snippet, field_count=field_count)
 
     def _insert_text(self, text: str) -> None:
         text_cursor = self._editor.textCursor()
@@ -289,6 +700,17 @@ class InputWindow(QtWidgets.QMainWindow):
             text_cursor.setPosition(new_pos)
             self._editor.setTextCursor(text_cursor)
 
+    # Shared handlers for the formatting actions; the tag or template comes from the triggering action's data().
+    def _on_wrap_action(self) -> None:
+        opening_tag, closing_tag = self.sender().data()
+        self._wrap_selection(opening_tag, closing_tag)
+
+    def _on_insert_action(self) -> None:
+        self._insert_text(self.sender().data())
+
+    def _on_template_action(self) -> None:
+        self._insert_template(self.sender().data())
+
     def _create_action(
         self,
         *,
@@ -297,9 +719,12 @@ class InputWindow(QtWidgets.QMainWindow):
         handler: Callable[[], None],
         shortcut: Optional[str] = None,
         add_to_toolbar: Optional[QtWidgets.QToolBar] = None,
+        data: object = None,
     ) -> QtGui.QAction:
         action = QtGui.QAction(label, self)
         action.setToolTip(tooltip)
+        if data is not None:
+            action.setData(data)
         action.triggered.connect(handler)
 
         if shortcut:
@@ -320,28 +745,32 @@ class InputWindow(QtWidgets.QMainWindow):
         self._create_action(
             label="B",
             tooltip="Bold (Ctrl+B)",
-            handler=lambda: self._wrap_selection("[b]", "[/b]"),
+            handler=self._on_wrap_action,
+            data=("[b]", "[/b]"),
             shortcut="Ctrl+B",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="I",
             tooltip="Italic (Ctrl+I)",
-            handler=lambda: self._wrap_selection("[i]", "[/i]"),
+            handler=self._on_wrap_action,
+            data=("[i]", "[/i]"),
             shortcut="Ctrl+I",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="U",
             tooltip="Underline (Ctrl+U)",
-            handler=lambda: self._wrap_selection("[u]", "[/u]"),
+            handler=self._on_wrap_action,
+            data=("[u]", "[/u]"),
             shortcut="Ctrl+U",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="Center",
             tooltip="Center (Ctrl+E)",
-            handler=lambda: self._wrap_selection("[center]", "[/center]"),
+            handler=self._on_wrap_action,
+            data=("[center]", "[/center]"),
             shortcut="Ctrl+E",
             add_to_toolbar=toolbar,
         )
@@ -350,21 +779,24 @@ class InputWindow(QtWidgets.QMainWindow):
         self._create_action(
             label="H1",
             tooltip="Heading 1 (Ctrl+1)",
-            handler=lambda: self._wrap_selection("[h1]", "[/h1]"),
+            handler=self._on_wrap_action,
+            data=("[h1]", "[/h1]"),
             shortcut="Ctrl+1",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="H2",
             tooltip="Heading 2 (Ctrl+2)",
-            handler=lambda: self._wrap_selection("[h2]", "[/h2]"),
+            handler=self._on_wrap_action,
+            data=("[h2]", "[/h2]"),
             shortcut="Ctrl+2",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="H3",
             tooltip="Heading 3 (Ctrl+3)",
-            handler=lambda: self._wrap_selection("[h3]", "[/h3]"),
+            handler=self._on_wrap_action,
+            data=("[h3]", "[/h3]"),
             shortcut="Ctrl+3",
             add_to_toolbar=toolbar,
         )
@@ -373,14 +805,16 @@ class InputWindow(QtWidgets.QMainWindow):
         self._create_action(
             label="Large",
             tooltip="Large text (Ctrl+Shift+L)",
-            handler=lambda: self._wrap_selection("[large]", "[/large]"),
+            handler=self._on_wrap_action,
+            data=("[large]", "[/large]"),
             shortcut="Ctrl+Shift+L",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="Small",
             tooltip="Small text (Ctrl+Shift+M) (pen mode)",
-            handler=lambda: self._wrap_selection("[small]", "[/small]"),
+            handler=self._on_wrap_action,
+            data=("[small]", "[/small]"),
             shortcut="Ctrl+Shift+M",
             add_to_toolbar=toolbar,
         )
@@ -389,28 +823,32 @@ class InputWindow(QtWidgets.QMainWindow):
         self._create_action(
             label="BR",
             tooltip="Line break (Ctrl+Enter)",
-            handler=lambda: self._insert_text("[br]"),
+            handler=self._on_insert_action,
+            data="[br]",
             shortcut="Ctrl+Enter",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="HR",
             tooltip="Horizontal rule (Ctrl+Shift+Enter) (pen mode)",
-            handler=lambda: self._insert_text("[hr]"),
+            handler=self._on_insert_action,
+            data="[hr]",
             shortcut="Ctrl+Shift+Enter",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="Tab",
             tooltip="Insert tab (Ctrl+T)",
-            handler=lambda: self._insert_text("[tab]"),
+            handler=self._on_insert_action,
+            data="[tab]",
             shortcut="Ctrl+T",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="Field",
             tooltip="Insert field (Ctrl+F)",
-            handler=lambda: self._insert_text("[field]"),
+            handler=self._on_insert_action,
+            data="[field]",
             shortcut="Ctrl+F",
             add_to_toolbar=toolbar,
         )
@@ -419,28 +857,32 @@ class InputWindow(QtWidgets.QMainWindow):
         self._create_action(
             label="Time",
             tooltip="Insert station time (Ctrl+Alt+T)",
-            handler=lambda: self._insert_text("[time]"),
+            handler=self._on_insert_action,
+            data="[time]",
             shortcut="Ctrl+Alt+T",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="Date",
             tooltip="Insert station date (Ctrl+Alt+D)",
-            handler=lambda: self._insert_text("[date]"),
+            handler=self._on_insert_action,
+            data="[date]",
             shortcut="Ctrl+Alt+D",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="Station",
             tooltip="Insert station name (Ctrl+Alt+S)",
-            handler=lambda: self._insert_text("[station]"),
+            handler=self._on_insert_action,
+            data="[station]",
             shortcut="Ctrl+Alt+S",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="Sign",
             tooltip="Insert signature (Ctrl+Alt+G)",
-            handler=lambda: self._insert_text("[sign]"),
+            handler=self._on_insert_action,
+            data="[sign]",
             shortcut="Ctrl+Alt+G",
             add_to_toolbar=toolbar,
         )
@@ -449,14 +891,16 @@ class InputWindow(QtWidgets.QMainWindow):
         self._create_action(
             label="List",
             tooltip="Insert list template (Ctrl+Shift+U) (pen mode)",
-            handler=lambda: self._insert_template("[list]\n[*] <<CURSOR>>\n[/list]\n"),
+            handler=self._on_template_action,
+            data="[list]\n[*] <<CURSOR>>\n[/list]\n",
             shortcut="Ctrl+Shift+U",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="Table",
             tooltip="Insert table template (Ctrl+Shift+T) (pen mode)",
-            handler=lambda: self._insert_template(
+            handler=self._on_template_action,
+            data=(
                 "[table]\n"
                 "[row]\n"
                 "[cell]<<CURSOR>>[/cell]\n"
@@ -470,7 +914,8 @@ class InputWindow(QtWidgets.QMainWindow):
         self._create_action(
             label="Grid",
             tooltip="Insert grid template (Ctrl+Shift+G) (pen mode)",
-            handler=lambda: self._insert_template(
+            handler=self._on_template_action,
+            data=(
                 "[grid]\n"
                 "[row]\n"
                 "[cell]<<CURSOR>>[/cell]\n"
@@ -486,25 +931,29 @@ class InputWindow(QtWidgets.QMainWindow):
         self._create_action(
             label="NT Logo",
             tooltip="Insert [logo] (pen mode)",
-            handler=lambda: self._insert_text("[logo]"),
+            handler=self._on_insert_action,
+            data="[logo]",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="SG Logo",
             tooltip="Insert [sglogo] (pen mode)",
-            handler=lambda: self._insert_text("[sglogo]"),
+            handler=self._on_insert_action,
+            data="[sglogo]",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="TR Logo",
             tooltip="Insert [trlogo] (pen mode)",
-            handler=lambda: self._insert_text("[trlogo]"),
+            handler=self._on_insert_action,
+            data="[trlogo]",
             add_to_toolbar=toolbar,
         )
         self._create_action(
             label="PC Logo",
             tooltip="Insert [pclogo] (pen mode)",
-            handler=lambda: self._insert_text("[pclogo]"),
+            handler=self._on_insert_action,
+            data="[pclogo]",
             add_to_toolbar=toolbar,
         )
 
@@ -549,6 +998,7 @@ class InputWindow(QtWidgets.QMainWindow):
 
     def toggle_crayon_mode(self) -> None:
         self._is_crayon = bool(self._crayon_mode_action.isChecked())
+        self._renderer = self._renderers[self._is_crayon]
         self._render_preview()
 
     def set_user_name(self) -> None:
@@ -615,7 +1065,7 @@ def main() -> int:
         pen_color="black",
     )
 
-    preview_window = PreviewWindow()
+    preview_window = PreviewWindow(paper_config=paper_config)
     input_window = InputWindow(preview_window, paper_config=paper_config, source_path=Path("PaperTest.ssnote"))
 
     screen = app.primaryScreen()